@@ -21,10 +21,12 @@ class BaseCommand(CommandExtension):
         super().__init__()
         self.verbs_group = verbs_group
 
-    def add_arguments(self, parser, cli_name):
+    def add_arguments(self, parser, cli_name, *, argv=None):
         self._subparser = parser
         # add arguments and sub-commands of verbs
-        add_subparsers_on_demand(parser, cli_name, "_verb", self.verbs_group, required=False)
+        add_subparsers_on_demand(
+            parser, cli_name, "_verb", self.verbs_group, required=False, argv=argv
+        )
 
     def main(self, *, parser, args):
         if not hasattr(args, "_verb"):
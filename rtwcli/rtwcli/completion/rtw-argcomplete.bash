@@ -13,8 +13,74 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Answer completions from the static table generated by rtwcli
+# (see rtwcli/completion.py for the format).
+# Returns 1 if the completion can't be answered statically.
+_rtw_complete_from_table() {
+  local cache_dir="${RTW_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/rtwcli}"
+  local table="$cache_dir/completion_table.tsv"
+  # the table is outdated if the plugin set changed since it was generated
+  [[ -f "$table" && "$table" -nt "$cache_dir/entry_points.json" ]] || return 1
+
+  local -A rows
+  local kind key words
+  while IFS=$'\t' read -r kind key words; do
+    key="$kind $key"
+    rows[$key]="$words"
+  done < "$table"
+
+  local path="${COMP_WORDS[0]##*/}" word expect_value="" i
+  for ((i = 1; i < COMP_CWORD; i++)); do
+    word="${COMP_WORDS[i]}"
+    if [[ -n "$expect_value" ]]; then
+      expect_value=""
+    elif [[ "$word" == -* ]]; then
+      [[ "$word" == *=* ]] && return 1
+      key="val $path"
+      [[ " ${rows[$key]} " == *" $word "* ]] && expect_value="$word"
+    else
+      key="sub $path"
+      [[ " ${rows[$key]} " == *" $word "* ]] && path="$path $word"
+    fi
+  done
+  # unknown command path
+  key="opt $path"
+  [[ -n "${rows[$key]+x}" ]] || return 1
+
+  local cur="${COMP_WORDS[COMP_CWORD]}"
+  if [[ -n "$expect_value" ]]; then
+    key="cho $path $expect_value"
+    [[ -n "${rows[$key]+x}" ]] || return 1
+    words="${rows[$key]}"
+  elif [[ "$cur" == -* ]]; then
+    key="opt $path"
+    words="${rows[$key]}"
+  else
+    key="dyn $path"
+    [[ -n "${rows[$key]+x}" ]] && return 1
+    key="sub $path"
+    words="${rows[$key]}"
+    key="pos $path"
+    words="$words ${rows[$key]}"
+  fi
+  COMPREPLY=($(compgen -W "$words" -- "$cur"))
+  if [[ ${#COMPREPLY[@]} -gt 0 ]]; then
+    COMPREPLY=("${COMPREPLY[@]/%/ }")
+  fi
+  return 0
+}
+
+# Use the static table if possible and argcomplete otherwise, e.g. for
+# dynamic completers. argcomplete also regenerates an outdated table.
+_rtw_complete() {
+  _rtw_complete_from_table && return 0
+  _python_argcomplete "$@"
+}
+
 if type register-python-argcomplete3 > /dev/null 2>&1; then
   eval "$(register-python-argcomplete3 rtw)"
+  complete -o nospace -o default -o bashdefault -F _rtw_complete rtw
 elif type register-python-argcomplete > /dev/null 2>&1; then
   eval "$(register-python-argcomplete rtw)"
+  complete -o nospace -o default -o bashdefault -F _rtw_complete rtw
 fi
@@ -0,0 +1,100 @@
+# Copyright 2023, Stogl Robotics Consulting UG (haftungsbeschränkt)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_path(*parts):
+    """
+    Get a path inside of the ``rtwcli`` cache directory.
+
+    The directory can be overridden with the ``RTW_CACHE_DIR`` environment
+    variable and defaults to ``$XDG_CACHE_HOME/rtwcli``.
+
+    :param parts: path components relative to the cache directory
+    :returns: the absolute path
+    :rtype: str
+    """
+    cache_dir = os.environ.get("RTW_CACHE_DIR")
+    if not cache_dir:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache_dir = os.path.join(xdg_cache_home, "rtwcli")
+    return os.path.join(cache_dir, *parts)
+
+
+def read_json(path):
+    """
+    Read a JSON cache file.
+
+    :param str path: the path of the file
+    :returns: the decoded content or ``None`` if the file doesn't exist or is
+      not valid
+    """
+    try:
+        with open(path, encoding="utf-8") as h:
+            return json.load(h)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.debug(f"Ignoring invalid cache file '{path}': {e}")
+        return None
+
+
+def write_json(path, data):
+    """
+    Atomically write a JSON cache file.
+
+    :param str path: the path of the file
+    :param data: the JSON serializable content
+    :returns: ``True`` if the file was written
+    :rtype: bool
+    """
+    return write_text(path, json.dumps(data, separators=(",", ":")))
+
+
+def write_text(path, text):
+    """
+    Atomically write a text cache file.
+
+    The content is written to a temporary file in the same directory which
+    then replaces the target, so concurrent readers never see partial data.
+    Failures are only logged since a cache is always optional.
+
+    :param str path: the path of the file
+    :param str text: the content
+    :returns: ``True`` if the file was written
+    :rtype: bool
+    """
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as h:
+                h.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        logger.debug(f"Failed to write cache file '{path}': {e}")
+        return False
+    return True
@@ -16,35 +16,96 @@
 
 import argparse
 import signal
+import sys
 
-from rtwcli.command import add_subparsers_on_demand
+# only import the light-weight client of the warm server here,
+# all other modules are imported if the invocation isn't forwarded
+from rtwcli.server import forward_to_server
 
+SELECTED_EXTENSION_KEY = "_command"
+
+# the special commands which are hidden in the help
+HIDDEN_COMMANDS = ["extension_points", "extensions"]
+
+
+def get_default_description(script_name):
+    return f"{script_name} is an extensible command-line tool for ROS Team Workspace."
+
+
+def create_parser(*, script_name="rtw", description=None, argv=None):
+    """
+    Create the top level parser with all command extensions.
+
+    :param str script_name: the name of the command line script
+    :param str description: the description of the top level parser
+    :param list argv: the list of command line arguments (default:
+      ``sys.argv``)
+    :rtype: :py:class:`argparse.ArgumentParser`
+    """
+    from rtwcli.command import add_subparsers_on_demand
 
-def main(*, script_name="rtw", argv=None, description=None, extension=None):
     if description is None:
-        description = f"{script_name} is an extensible command-line tool for ROS Team Workspace."
+        description = get_default_description(script_name)
 
     # top level parser
     parser = argparse.ArgumentParser(
         description=description, formatter_class=argparse.RawDescriptionHelpFormatter
     )
 
+    # get command entry points as needed
+    add_subparsers_on_demand(
+        parser,
+        script_name,
+        SELECTED_EXTENSION_KEY,
+        "rtwcli.command",
+        hide_extensions=HIDDEN_COMMANDS,
+        required=False,
+        argv=argv,
+    )
+    return parser
+
+
+def main(*, script_name="rtw", argv=None, description=None, extension=None):
+    if extension is None:
+        # run the command in the warm server if it is running
+        rc = forward_to_server(sys.argv[1:] if argv is None else argv)
+        if rc is not None:
+            return rc
+
+    from rtwcli.command import _is_completion_requested
+    from rtwcli.completion import update_completion_table_in_background
+    from rtwcli.manifest import get_manifest_key
+    from rtwcli.manifest import get_requested_help_path
+    from rtwcli.manifest import print_help_from_manifest
+    from rtwcli.manifest import record_help_in_manifest
+
+    if description is None:
+        description = get_default_description(script_name)
+
+    # render the help from the static manifest if possible
+    help_path = None
+    if extension is None and not _is_completion_requested():
+        help_path = get_requested_help_path(sys.argv[1:] if argv is None else argv)
+    if help_path is not None:
+        manifest_key = get_manifest_key(script_name, description)
+        if print_help_from_manifest(manifest_key, help_path):
+            return 0
+
     # add arguments for command extension(s)
     if extension:
+        # top level parser
+        parser = argparse.ArgumentParser(
+            description=description, formatter_class=argparse.RawDescriptionHelpFormatter
+        )
         extension.add_arguments(parser, script_name)
     else:
-        # get command entry points as needed
-        selected_extension_key = "_command"
-        add_subparsers_on_demand(
-            parser,
-            script_name,
-            selected_extension_key,
-            "rtwcli.command",
-            # hide the special commands in the help
-            hide_extensions=["extension_points", "extensions"],
-            required=False,
-            argv=argv,
-        )
+        if _is_completion_requested():
+            # let future completions be answered from the static table
+            update_completion_table_in_background(script_name, description)
+        parser = create_parser(script_name=script_name, description=description, argv=argv)
+        if help_path is not None:
+            # store the help for this path to avoid the plugin imports next time
+            record_help_in_manifest(manifest_key, parser, help_path)
 
     # register argcomplete hook if available
     try:
@@ -59,7 +120,7 @@ def main(*, script_name="rtw", argv=None, description=None, extension=None):
 
     if extension is None:
         # get extension identified by the passed command (if available)
-        extension = getattr(args, selected_extension_key, None)
+        extension = getattr(args, SELECTED_EXTENSION_KEY, None)
 
     # handle the case that no command was passed
     if extension is None:
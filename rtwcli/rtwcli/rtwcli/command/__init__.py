@@ -17,8 +17,11 @@
 import argparse
 import inspect
 import os
+import sys
 import types
 
+from rtwcli.dispatch import record_dispatch_group
+from rtwcli.dispatch import resolve_command_path
 from rtwcli.entry_points import get_entry_points
 from rtwcli.entry_points import get_first_line_doc
 from rtwcli.plugin_system import instantiate_extensions
@@ -91,6 +94,11 @@ def add_subparsers_on_demand(
     potentially its recursive extensions) are loaded and instantiated.
     If the extension has an ``add_arguments`` method it is being called.
 
+    The selected extensions are resolved from the command line arguments in a
+    single pass over the registered names (see :py:mod:`rtwcli.dispatch`).
+    Only if that isn't possible (e.g. options precede the command) the
+    arguments are parsed at each level to find the selected extension.
+
     :param parser: the parent argument parser
     :type parser: :py:class:`argparse.ArgumentParser`
     :param str cli_name: name of the command line command to which the
@@ -105,6 +113,116 @@ def add_subparsers_on_demand(
     :param list argv: the list of command line arguments (default:
       ``sys.argv``)
     """
+    command_path = getattr(parser, "_rtw_command_path", [])
+    record_dispatch_group(command_path, group_name)
+
+    selection = _get_preselected_command_path(parser, group_name, argv)
+    if selection is None:
+        return _add_subparsers_by_parsing(
+            parser, cli_name, dest, group_name, hide_extensions, required, argv
+        )
+    names, complete = selection
+
+    entry_points = get_entry_points(group_name)
+    if not names:
+        # add description for all command extensions to the root parser
+        command_extensions = get_command_extensions(group_name)
+        description = _get_commands_description(command_extensions, hide_extensions)
+    else:
+        command_extensions = get_command_extensions(
+            group_name, exclude_names=set(entry_points.keys() - {names[0]})
+        )
+        description = ""
+
+    subparser = parser.add_subparsers(
+        title="Commands",
+        description=description,
+        metavar=f"Call `{cli_name} <command> -h` for more detailed usage.",
+    )
+    # use a name which doesn't collide with any argument
+    # but is readable when shown as part of the the usage information
+    subparser.dest = " " + dest.lstrip("_")
+    subparser.required = required
+
+    if not names:
+        for name in sorted(entry_points.keys()):
+            command_parser = subparser.add_parser(
+                name, formatter_class=argparse.RawDescriptionHelpFormatter
+            )
+            if name in command_extensions and (
+                hide_extensions is None or name not in hide_extensions
+            ):
+                command_parser.set_defaults(**{dest: command_extensions[name]})
+        return subparser
+
+    # only the parser of the selected extension is needed
+    name = names[0]
+    command_parser = subparser.add_parser(
+        name, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    command_parser._rtw_command_path = command_path + [name]
+    if names[1:] or complete:
+        command_parser._rtw_selection = (names[1:], complete)
+        _add_command_extension_arguments(
+            command_parser, command_extensions[name], cli_name, name, dest, argv
+        )
+    else:
+        # the selection of nested extensions requires parsing the arguments
+        command_parser._root_parser = getattr(parser, "_root_parser", parser)
+        _add_command_extension_arguments(
+            command_parser, command_extensions[name], cli_name, name, dest, argv
+        )
+        del command_parser._root_parser
+    return subparser
+
+
+def _get_preselected_command_path(parser, group_name, argv):
+    if _is_completion_requested():
+        return None
+    selection = getattr(parser, "_rtw_selection", None)
+    if selection is not None:
+        return selection
+    if hasattr(parser, "_root_parser"):
+        # a parent level couldn't be resolved without parsing
+        return None
+    names, complete = resolve_command_path(sys.argv[1:] if argv is None else argv, group_name)
+    if not names and not complete:
+        return None
+    return names, complete
+
+
+def _get_commands_description(command_extensions, hide_extensions):
+    names = [
+        name
+        for name in sorted(command_extensions.keys())
+        if hide_extensions is None or name not in hide_extensions
+    ]
+    if not names:
+        return ""
+    max_length = max(len(name) for name in names)
+    description = ""
+    for name in names:
+        description += "{}  {}\n".format(
+            name.ljust(max_length), get_first_line_doc(command_extensions[name])
+        )
+    return description
+
+
+def _add_command_extension_arguments(command_parser, extension, cli_name, name, dest, argv):
+    # add description for the selected command extension to the subparser
+    command_parser.set_defaults(**{dest: extension})
+    command_parser.description = get_first_line_doc(extension)
+
+    # add the arguments for the requested extension
+    if hasattr(extension, "add_arguments"):
+        signature = inspect.signature(extension.add_arguments)
+        kwargs = {}
+        if "argv" in signature.parameters:
+            kwargs["argv"] = argv
+        extension.add_arguments(command_parser, f"{cli_name} {name}", **kwargs)
+
+
+def _add_subparsers_by_parsing(parser, cli_name, dest, group_name, hide_extensions, required, argv):
     # add subparser without a description for now
     mutable_description = MutableString()
     subparser = parser.add_subparsers(
@@ -175,6 +293,7 @@ def add_subparsers_on_demand(
         )
         extension = command_extensions[name]
         command_parser = command_parsers[name]
+        command_parser._rtw_command_path = getattr(parser, "_rtw_command_path", []) + [name]
         command_parser.set_defaults(**{dest: extension})
         command_parser.description = get_first_line_doc(extension)
 
@@ -0,0 +1,79 @@
+# Copyright 2023, Stogl Robotics Consulting UG (haftungsbeschränkt)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+from rtwcli.command import CommandExtension
+from rtwcli.server import DEFAULT_IDLE_TIMEOUT
+from rtwcli.server import get_socket_path
+from rtwcli.server import send_request
+from rtwcli.server import serve
+from rtwcli.server import start_server_in_background
+
+
+class ServerCommand(CommandExtension):
+    """Manage the warm server which speeds up repeated invocations."""
+
+    def add_arguments(self, parser, cli_name):
+        parser.add_argument(
+            "action",
+            choices=["start", "stop", "status"],
+            help="Start, stop or query the server",
+        )
+        parser.add_argument(
+            "--foreground",
+            action="store_true",
+            default=False,
+            help="Run the server in the foreground instead of detaching it",
+        )
+        parser.add_argument(
+            "--idle-timeout",
+            type=float,
+            default=DEFAULT_IDLE_TIMEOUT,
+            help="Stop the server after being idle for this many seconds "
+            "(0 to never stop, default: %(default)s)",
+        )
+
+    def main(self, *, parser, args):
+        status = send_request({"command": "status"}, timeout=1.0)
+        if args.action == "status":
+            if status is None:
+                print("The rtw server is not running.")
+                return 1
+            uptime = time.time() - status["started"]
+            print(
+                f"The rtw server is running (pid {status['pid']}, up {uptime:.0f}s, "
+                f"{status['requests']} requests) on '{get_socket_path()}'."
+            )
+            return 0
+
+        if args.action == "stop":
+            if status is None:
+                print("The rtw server is not running.")
+                return 0
+            send_request({"command": "stop"})
+            print("The rtw server was stopped.")
+            return 0
+
+        if status is not None:
+            print(f"The rtw server is already running (pid {status['pid']}).")
+            return 0
+        if args.foreground:
+            serve(idle_timeout=args.idle_timeout)
+            return 0
+        status = start_server_in_background(idle_timeout=args.idle_timeout)
+        if status is None:
+            return "Failed to start the rtw server"
+        print(f"The rtw server was started (pid {status['pid']}).")
+        return 0
@@ -0,0 +1,239 @@
+# Copyright 2023, Stogl Robotics Consulting UG (haftungsbeschränkt)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Precomputed completion table for the shell hooks.
+
+The table contains all static completions (commands, verbs, options and
+choices) of the command tree, one tab separated row per entry::
+
+    sub  <path>           <names of sub-commands>
+    opt  <path>           <option strings>
+    val  <path>           <option strings which expect a value>
+    cho  <path> <option>  <static choices of the option>
+    pos  <path>           <static choices of positional arguments>
+    dyn  <path>           (positional arguments without static choices)
+
+``<path>`` is the script name followed by the command / verb names.
+The shell hooks in ``completion/rtw-argcomplete.bash`` answer completions
+from this table and only fall back to ``argcomplete`` for entries which
+aren't static.
+The table is considered outdated if it is older than the entry point index.
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from rtwcli.cache import get_cache_path
+from rtwcli.cache import write_text
+from rtwcli.entry_points import get_entry_point_index
+from rtwcli.entry_points import get_entry_point_index_path
+from rtwcli.manifest import get_child_parser
+from rtwcli.manifest import get_manifest_key
+from rtwcli.manifest import record_helps_in_manifest
+
+# A stale lock is ignored after this many seconds.
+LOCK_TIMEOUT = 300
+
+logger = logging.getLogger(__name__)
+
+
+def get_completion_table_path():
+    """Get the path of the completion table."""
+    return get_cache_path("completion_table.tsv")
+
+
+def is_completion_table_current():
+    """
+    Check if the completion table is newer than the entry point index.
+
+    :rtype: bool
+    """
+    try:
+        table_mtime = os.stat(get_completion_table_path()).st_mtime_ns
+    except OSError:
+        return False
+    try:
+        index_mtime = os.stat(get_entry_point_index_path()).st_mtime_ns
+    except OSError:
+        return True
+    return table_mtime > index_mtime
+
+
+def update_completion_table_in_background(script_name, description):
+    """
+    Regenerate an outdated completion table in a detached process.
+
+    The current completion request isn't delayed and is answered by
+    ``argcomplete`` as before.
+
+    :param str script_name: the name of the command line script
+    :param str description: the description of the top level parser
+    """
+    # make sure the index is up-to-date before comparing timestamps
+    get_entry_point_index()
+    if is_completion_table_current() or not _acquire_lock():
+        return
+    env = dict(os.environ)
+    for name in ("_ARGCOMPLETE", "COMP_LINE", "COMP_POINT", "COMP_TYPE"):
+        env.pop(name, None)
+    prog = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else script_name
+    try:
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "rtwcli.completion",
+                script_name,
+                "--description",
+                description,
+                "--prog",
+                prog,
+            ],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            start_new_session=True,
+        )
+    except OSError as e:
+        logger.debug(f"Failed to start the completion table generation: {e}")
+        _release_lock()
+
+
+def write_completion_table(script_name, description):
+    """
+    Generate the completion table of the full command tree.
+
+    All extensions are loaded once to walk the tree.
+    The help of every visited path is recorded in the manifest as well.
+
+    :param str script_name: the name of the command line script
+    :param str description: the description of the top level parser
+    :returns: ``True`` if the table was written
+    :rtype: bool
+    """
+    # import late to avoid a circular import
+    from rtwcli.cli import create_parser
+
+    rows = []
+    parsers_and_paths = []
+    pending = [[]]
+    while pending:
+        path = pending.pop(0)
+        try:
+            parser = create_parser(script_name=script_name, description=description, argv=path)
+        except SystemExit:
+            continue
+        target = get_child_parser(parser, path)
+        if target is None:
+            continue
+        parsers_and_paths.append((parser, path))
+        for name in _add_rows(rows, " ".join([script_name, *path]), target):
+            pending.append([*path, name])
+
+    record_helps_in_manifest(get_manifest_key(script_name, description), parsers_and_paths)
+    return write_text(
+        get_completion_table_path(), "".join("\t".join(row) + "\n" for row in rows)
+    )
+
+
+def _add_rows(rows, key, parser):
+    names = []
+    options = []
+    value_options = []
+    positional_choices = []
+    dynamic = False
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            names.extend(action.choices.keys())
+            continue
+        if isinstance(action, argparse._HelpAction) or action.help == argparse.SUPPRESS:
+            continue
+        static_choices = action.choices is not None and not hasattr(action, "completer")
+        if not action.option_strings:
+            if static_choices:
+                positional_choices.extend(str(c) for c in action.choices)
+            else:
+                dynamic = True
+            continue
+        options.extend(action.option_strings)
+        if action.nargs == 0:
+            continue
+        value_options.extend(action.option_strings)
+        if static_choices:
+            for option in action.option_strings:
+                rows.append(("cho", f"{key} {option}", " ".join(str(c) for c in action.choices)))
+
+    rows.append(("sub", key, " ".join(names)))
+    rows.append(("opt", key, " ".join(options)))
+    rows.append(("val", key, " ".join(value_options)))
+    rows.append(("pos", key, " ".join(positional_choices)))
+    if dynamic:
+        rows.append(("dyn", key, ""))
+    return names
+
+
+def _get_lock_path():
+    return get_cache_path("completion_table.lock")
+
+
+def _acquire_lock():
+    path = _get_lock_path()
+    try:
+        if time.time() - os.stat(path).st_mtime > LOCK_TIMEOUT:
+            os.unlink(path)
+    except OSError:
+        pass
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError:
+        return False
+    return True
+
+
+def _release_lock():
+    try:
+        os.unlink(_get_lock_path())
+    except OSError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the rtw completion table.")
+    parser.add_argument("script_name", nargs="?", default="rtw")
+    parser.add_argument("--description", default=None)
+    parser.add_argument("--prog", default=None, help="Program name of the top level parser")
+    args = parser.parse_args(argv)
+
+    # the program name of the top level parser is derived from the executable
+    sys.argv[0] = args.prog or args.script_name
+    if args.description is None:
+        from rtwcli.cli import get_default_description
+
+        args.description = get_default_description(args.script_name)
+    try:
+        return 0 if write_completion_table(args.script_name, args.description) else 1
+    finally:
+        _release_lock()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
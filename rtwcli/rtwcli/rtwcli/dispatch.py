@@ -0,0 +1,109 @@
+# Copyright 2023, Stogl Robotics Consulting UG (haftungsbeschränkt)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Single-pass resolution of the selected command / verb path.
+
+The registered names form a prefix trie: the children of the root are the
+entry points of the top level group (e.g. ``rtwcli.command``) and the
+children of a command are the entry points of the group passed to
+``add_subparsers_on_demand`` by that command (e.g. ``rtw_cmds.pkg.verbs``).
+The names of each level are taken from the entry point index while the
+group of each inner node is learned the first time the command is executed
+and stored in the cache.
+"""
+
+from rtwcli.cache import get_cache_path
+from rtwcli.cache import read_json
+from rtwcli.cache import write_json
+from rtwcli.entry_points import get_entry_point_index
+from rtwcli.entry_points import get_entry_points
+
+HELP_OPTIONS = ("-h", "--help")
+
+_dispatch_groups = None
+
+
+def get_dispatch_groups_path():
+    """Get the path of the cached sub-command groups."""
+    return get_cache_path("dispatch_groups.json")
+
+
+def get_dispatch_groups():
+    """
+    Get the entry point groups providing the sub-commands of each command.
+
+    :returns: mapping of command paths (names separated by spaces) to the
+      group name of their sub-commands
+    :rtype: dict
+    """
+    global _dispatch_groups
+    if _dispatch_groups is None:
+        data = read_json(get_dispatch_groups_path())
+        if not isinstance(data, dict) or data.get("fingerprint") != _get_fingerprint():
+            data = {"fingerprint": _get_fingerprint(), "groups": {}}
+        _dispatch_groups = data
+    return _dispatch_groups["groups"]
+
+
+def record_dispatch_group(command_path, group_name):
+    """
+    Remember the entry point group providing the sub-commands of a command.
+
+    :param list command_path: the names of the command / verb
+    :param str group_name: the name of the ``entry_point`` group
+    """
+    if not command_path:
+        # the group of the top level is always passed explicitly
+        return
+    groups = get_dispatch_groups()
+    key = " ".join(command_path)
+    if groups.get(key) == group_name:
+        return
+    groups[key] = group_name
+    write_json(get_dispatch_groups_path(), _dispatch_groups)
+
+
+def resolve_command_path(argv, group_name):
+    """
+    Resolve the selected command / verb names from the arguments.
+
+    Only leading arguments matching registered names are consumed.
+    The resolution is complete if it is known that no further sub-command is
+    selected, i.e. the arguments end or continue with a help option after a
+    command whose sub-command group is known.
+
+    :param list argv: the command line arguments
+    :param str group_name: the name of the top level ``entry_point`` group
+    :returns: a tuple of the list of names and a flag if the resolution is
+      complete
+    :rtype: tuple
+    """
+    groups = get_dispatch_groups()
+    names = []
+    for token in argv:
+        if group_name is None:
+            # unknown if the command has any sub-commands
+            return names, False
+        if token in HELP_OPTIONS:
+            return names, True
+        if token not in get_entry_points(group_name):
+            return names, False
+        names.append(token)
+        group_name = groups.get(" ".join(names))
+    return names, group_name is not None
+
+
+def _get_fingerprint():
+    return get_entry_point_index()["fingerprint"]
@@ -15,13 +15,21 @@
 # limitations under the License.
 
 from collections import defaultdict
+import hashlib
 import logging
+import os
+import pathlib
+import sys
 
 try:
     import importlib.metadata as importlib_metadata
 except ModuleNotFoundError:
     import importlib_metadata
 
+from rtwcli.cache import get_cache_path
+from rtwcli.cache import read_json
+from rtwcli.cache import write_json
+
 
 # The group name for entry points identifying extension points.
 # While all entry points in this package start with ``rtwcli.`` other
@@ -29,8 +37,152 @@ except ModuleNotFoundError:
 # Those need to be declared using this group name.
 EXTENSION_POINT_GROUP_NAME = "rtwcli.extension_point"
 
+# The prefix of all entry point groups which are always part of the index.
+ENTRY_POINT_GROUP_PREFIX = "rtwcli."
+
+# Bump whenever the layout of the persistent entry point index changes.
+ENTRY_POINT_INDEX_VERSION = 1
+
 logger = logging.getLogger(__name__)
 
+_entry_point_index = None
+
+
+def get_environment_fingerprint(path=None):
+    """
+    Get a fingerprint of the installed distributions.
+
+    The fingerprint covers the ``sys.path`` entries containing distributions
+    as well as the modification times of all ``dist-info`` / ``egg-info``
+    directories (and their ``entry_points.txt`` files) found in them.
+    Entries without any distributions (e.g. the directory of the executed
+    script) don't affect the fingerprint.
+    It only requires a directory listing of each path entry and is therefore
+    much cheaper than reading the metadata of every distribution.
+
+    :param list path: the search path (default: ``sys.path``)
+    :returns: the hex digest of the fingerprint
+    :rtype: str
+    """
+    digest = hashlib.sha1()
+    for entry in sys.path if path is None else path:
+        try:
+            with os.scandir(entry or ".") as it:
+                dist_entries = sorted(
+                    (e for e in it if e.name.endswith((".dist-info", ".egg-info"))),
+                    key=lambda e: e.name,
+                )
+        except OSError:
+            continue
+        if not dist_entries:
+            continue
+        digest.update(entry.encode() + b"\0")
+        for dist_entry in dist_entries:
+            try:
+                mtime = dist_entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            digest.update(f"{dist_entry.name}:{mtime}".encode())
+            try:
+                mtime = os.stat(os.path.join(dist_entry.path, "entry_points.txt")).st_mtime_ns
+            except OSError:
+                continue
+            digest.update(f":{mtime}".encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_entry_point_index_path():
+    """Get the path of the persistent entry point index."""
+    return get_cache_path("entry_points.json")
+
+
+def get_entry_point_index():
+    """
+    Get the index of all entry points related to ``rtwcli``.
+
+    The index is stored in the ``rtwcli`` cache directory and reused as long
+    as the fingerprint of the installed distributions doesn't change.
+    Otherwise it is rebuilt by scanning all distributions once.
+    Within a process the index is only loaded once.
+
+    :returns: the index with the keys ``fingerprint``, ``extension_points``
+      and ``groups`` (mapping group names to entry point names to a tuple of
+      the entry point value and the path of the distribution)
+    :rtype: dict
+    """
+    global _entry_point_index
+    if _entry_point_index is None:
+        fingerprint = get_environment_fingerprint()
+        index_path = get_entry_point_index_path()
+        index = read_json(index_path)
+        if (
+            not isinstance(index, dict)
+            or index.get("version") != ENTRY_POINT_INDEX_VERSION
+            or index.get("fingerprint") != fingerprint
+        ):
+            index = _build_entry_point_index(fingerprint)
+            write_json(index_path, index)
+        _entry_point_index = index
+    return _entry_point_index
+
+
+def invalidate_entry_point_index():
+    """Drop the in-process copy of the entry point index."""
+    global _entry_point_index
+    _entry_point_index = None
+    _entry_point_instances.clear()
+
+
+def _build_entry_point_index(fingerprint):
+    groups = defaultdict(dict)
+    for dist in _get_unique_distributions():
+        dist_path = getattr(dist, "_path", None)
+        for ep in dist.entry_points:
+            groups[ep.group][ep.name] = (ep.value, None if dist_path is None else str(dist_path))
+
+    extension_points = sorted(groups.get(EXTENSION_POINT_GROUP_NAME, {}).keys())
+    return {
+        "version": ENTRY_POINT_INDEX_VERSION,
+        "fingerprint": fingerprint,
+        "extension_points": extension_points,
+        "groups": {
+            group_name: entry_points
+            for group_name, entry_points in groups.items()
+            if _is_indexed_group(group_name, extension_points)
+        },
+    }
+
+
+def _get_unique_distributions():
+    # same as the entry point lookup of importlib.metadata:
+    # only the first distribution with a specific name is considered
+    seen = set()
+    for dist in importlib_metadata.distributions():
+        name = dist.metadata["Name"]
+        normalized_name = name.lower().replace("-", "_") if name else None
+        if normalized_name is not None:
+            if normalized_name in seen:
+                continue
+            seen.add(normalized_name)
+        yield dist
+
+
+def _is_indexed_group(group_name, extension_points):
+    return group_name.startswith(ENTRY_POINT_GROUP_PREFIX) or group_name in extension_points
+
+
+_entry_point_instances = {}
+
+
+def _get_indexed_entry_point(group_name, name, value):
+    key = (group_name, name, value)
+    entry_point = _entry_point_instances.get(key)
+    if entry_point is None:
+        entry_point = importlib_metadata.EntryPoint(name=name, value=value, group=group_name)
+        _entry_point_instances[key] = entry_point
+    return entry_point
+
 
 def get_all_entry_points():
     """
@@ -39,17 +191,23 @@ def get_all_entry_points():
     :returns: mapping of entry point names to ``EntryPoint`` instances
     :rtype: dict
     """
-    extension_points = get_entry_points(EXTENSION_POINT_GROUP_NAME)
+    index = get_entry_point_index()
 
     entry_points = defaultdict(dict)
 
-    for dist in importlib_metadata.distributions():
-        for ep in dist.entry_points:
-            # skip groups which are not registered as extension points
-            if ep.group not in extension_points:
-                continue
-
-            entry_points[ep.group][ep.name] = (dist, ep)
+    distributions = {}
+    for group_name in index["extension_points"]:
+        for name, (value, dist_path) in index["groups"].get(group_name, {}).items():
+            if dist_path not in distributions:
+                distributions[dist_path] = (
+                    None
+                    if dist_path is None
+                    else importlib_metadata.PathDistribution(pathlib.Path(dist_path))
+                )
+            entry_points[group_name][name] = (
+                distributions[dist_path],
+                _get_indexed_entry_point(group_name, name, value),
+            )
     return entry_points
 
 
@@ -62,6 +220,14 @@ def get_entry_points(group_name):
       to ``EntryPoint`` instances
     :rtype: dict
     """
+    index = get_entry_point_index()
+    if _is_indexed_group(group_name, index["extension_points"]):
+        return {
+            name: _get_indexed_entry_point(group_name, name, value)
+            for name, (value, _) in index["groups"].get(group_name, {}).items()
+        }
+
+    # fall back to scanning the metadata for groups which are not indexed
     entry_points_impl = importlib_metadata.entry_points()
     if hasattr(entry_points_impl, "select"):
         groups = entry_points_impl.select(group=group_name)
@@ -0,0 +1,423 @@
+# Copyright 2023, Stogl Robotics Consulting UG (haftungsbeschränkt)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Static manifest of the command tree.
+
+The help of a command only depends on the one-line docstrings of the
+extensions and on the arguments they register.
+This module serializes the argument parser of every command / verb for which
+the help has been rendered once and stores it next to the entry point index.
+Later help requests for the same path are rendered from that manifest without
+importing any plugin code.
+The manifest is invalidated together with the entry point index as well as
+when any of the modules which contributed to a node is modified.
+"""
+
+import argparse
+import inspect
+import json
+import logging
+import os
+import sys
+
+from rtwcli.cache import get_cache_path
+from rtwcli.cache import read_json
+from rtwcli.cache import write_json
+from rtwcli.entry_points import get_entry_point_index
+
+# Bump whenever the layout of the serialized parsers changes.
+MANIFEST_VERSION = 1
+
+HELP_OPTIONS = ("-h", "--help")
+
+logger = logging.getLogger(__name__)
+
+_FORMATTER_CLASSES = {
+    cls.__name__: cls
+    for cls in (
+        argparse.HelpFormatter,
+        argparse.RawDescriptionHelpFormatter,
+        argparse.RawTextHelpFormatter,
+        argparse.ArgumentDefaultsHelpFormatter,
+        argparse.MetavarTypeHelpFormatter,
+    )
+}
+
+_ACTION_KWARGS = (
+    "dest",
+    "nargs",
+    "const",
+    "default",
+    "choices",
+    "required",
+    "help",
+    "metavar",
+    "version",
+)
+
+
+class UnsupportedParser(Exception):
+    """Raised if a parser uses features which can't be represented statically."""
+
+    pass
+
+
+def get_manifest_path():
+    """Get the path of the persistent command manifest."""
+    return get_cache_path("command_manifest.json")
+
+
+def get_manifest_key(script_name, description):
+    """
+    Get the key identifying the command tree of a specific CLI.
+
+    :param str script_name: the name of the command line script
+    :param str description: the description of the top level parser
+    :rtype: str
+    """
+    # the program name of the top level parser is derived from the executable
+    prog = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else script_name
+    return json.dumps([script_name, description, prog])
+
+
+def get_requested_help_path(argv):
+    """
+    Get the command path for which only the help has been requested.
+
+    :param list argv: the command line arguments
+    :returns: the list of command / verb names or ``None`` if the arguments
+      don't request just the help (e.g. ``rtw`` or ``rtw pkg -h``)
+    """
+    if not argv:
+        return []
+    *path, last = argv
+    if last not in HELP_OPTIONS:
+        return None
+    if any(not name or name.startswith("-") for name in path):
+        return None
+    return path
+
+
+def load_manifest_nodes(key):
+    """
+    Load the serialized parsers of a command tree.
+
+    :param str key: the key identifying the command tree
+    :returns: mapping of command paths to serialized parsers, empty if the
+      manifest doesn't exist or is outdated
+    :rtype: dict
+    """
+    manifest = read_json(get_manifest_path())
+    if not _is_valid_manifest(manifest):
+        return {}
+    return manifest["trees"].get(key, {})
+
+
+def print_help_from_manifest(key, path, *, file=None):
+    """
+    Print the help for a command path from the manifest.
+
+    :param str key: the key identifying the command tree
+    :param list path: the command / verb names
+    :param file: the stream to print to (default: ``sys.stdout``)
+    :returns: ``True`` if the help was printed, ``False`` if the manifest
+      doesn't contain a valid entry for the path
+    :rtype: bool
+    """
+    node = load_manifest_nodes(key).get(" ".join(path))
+    if node is None or not _are_sources_unchanged(node):
+        return False
+    try:
+        parser = create_parser_from_node(node)
+    except (TypeError, ValueError, KeyError) as e:
+        logger.debug(f"Failed to restore parser for '{' '.join(path)}': {e}")
+        return False
+    parser.print_help(file=file)
+    return True
+
+
+def record_help_in_manifest(key, parser, path):
+    """
+    Serialize the parser of a command path into the manifest.
+
+    :param str key: the key identifying the command tree
+    :param parser: the fully constructed top level parser
+    :type parser: :py:class:`argparse.ArgumentParser`
+    :param list path: the command / verb names
+    :returns: ``True`` if the manifest was updated
+    :rtype: bool
+    """
+    return record_helps_in_manifest(key, [(parser, path)])
+
+
+def record_helps_in_manifest(key, parsers_and_paths):
+    """
+    Serialize the parsers of multiple command paths into the manifest.
+
+    :param str key: the key identifying the command tree
+    :param parsers_and_paths: pairs of fully constructed top level parsers
+      and the command / verb names for which their help should be recorded
+    :returns: ``True`` if the manifest was updated
+    :rtype: bool
+    """
+    nodes = {}
+    for parser, path in parsers_and_paths:
+        target = get_child_parser(parser, path)
+        if target is None:
+            continue
+        try:
+            node = serialize_parser(target)
+        except UnsupportedParser as e:
+            logger.debug(f"Not adding '{' '.join(path)}' to the command manifest: {e}")
+            continue
+        node["sources"] = _get_sources(target)
+        nodes[" ".join(path)] = node
+    if not nodes:
+        return False
+
+    manifest = read_json(get_manifest_path())
+    if not _is_valid_manifest(manifest):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": get_entry_point_index()["fingerprint"],
+            "trees": {},
+        }
+    manifest["trees"].setdefault(key, {}).update(nodes)
+    return write_json(get_manifest_path(), manifest)
+
+
+def get_child_parser(parser, path):
+    """
+    Get the parser of a (nested) sub-command.
+
+    :param parser: the top level parser
+    :type parser: :py:class:`argparse.ArgumentParser`
+    :param list path: the command / verb names
+    :returns: the parser or ``None`` if the path doesn't exist
+    """
+    for name in path:
+        action = get_subparsers_action(parser)
+        if action is None or name not in action.choices:
+            return None
+        parser = action.choices[name]
+    return parser
+
+
+def get_subparsers_action(parser):
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            return action
+    return None
+
+
+def serialize_parser(parser):
+    """
+    Serialize the help relevant state of an argument parser.
+
+    :param parser: the parser
+    :type parser: :py:class:`argparse.ArgumentParser`
+    :returns: a JSON serializable representation
+    :rtype: dict
+    :raises UnsupportedParser: if the parser uses features which can't be
+      represented
+    """
+    if parser._mutually_exclusive_groups:
+        raise UnsupportedParser("mutually exclusive groups")
+    formatter_class = _FORMATTER_CLASSES.get(getattr(parser.formatter_class, "__name__", None))
+    if formatter_class is not parser.formatter_class:
+        raise UnsupportedParser(f"formatter class '{parser.formatter_class!r}'")
+
+    action_names = {}
+    for name, cls in parser._registries["action"].items():
+        if name is not None:
+            action_names.setdefault(cls, name)
+
+    groups = []
+    group_indices = {}
+    for group in parser._action_groups:
+        for action in group._group_actions:
+            group_indices[action] = len(groups)
+        groups.append({"title": group.title, "description": _to_str(group.description)})
+
+    actions = []
+    subparsers = None
+    for i, action in enumerate(parser._actions):
+        if isinstance(action, argparse._SubParsersAction):
+            if i != len(parser._actions) - 1:
+                raise UnsupportedParser("sub-commands followed by other arguments")
+            subparsers = _serialize_subparsers(action, groups, group_indices)
+            continue
+        kind = action_names.get(type(action))
+        if kind is None:
+            raise UnsupportedParser(f"custom action '{type(action).__name__}'")
+        data = {
+            "kind": kind,
+            "group": group_indices.get(action, 1),
+            "option_strings": list(action.option_strings),
+        }
+        for name in _ACTION_KWARGS:
+            if hasattr(action, name):
+                data[name] = _to_json(getattr(action, name))
+        if isinstance(data.get("metavar"), list):
+            data["metavar_tuple"] = True
+        actions.append(data)
+
+    return {
+        "prog": parser.prog,
+        "usage": parser.usage,
+        "description": _to_str(parser.description),
+        "epilog": _to_str(parser.epilog),
+        "formatter_class": formatter_class.__name__,
+        "prefix_chars": parser.prefix_chars,
+        "groups": groups,
+        "actions": actions,
+        "subparsers": subparsers,
+    }
+
+
+def _serialize_subparsers(action, groups, group_indices):
+    group_index = group_indices.get(action, 0)
+    if group_index != len(groups) - 1 and group_index != 0:
+        raise UnsupportedParser("sub-commands followed by other argument groups")
+    return {
+        "group": group_index,
+        "dest": action.dest,
+        "required": action.required,
+        "help": action.help,
+        "metavar": _to_str(action.metavar),
+        "choices": list(action.choices.keys()),
+    }
+
+
+def create_parser_from_node(node):
+    """
+    Create an argument parser from its serialized representation.
+
+    The resulting parser is only meant to render the help and doesn't
+    register any extensions.
+
+    :param dict node: the serialized parser
+    :rtype: :py:class:`argparse.ArgumentParser`
+    """
+    parser = argparse.ArgumentParser(
+        prog=node["prog"],
+        usage=node["usage"],
+        description=node["description"],
+        epilog=node["epilog"],
+        formatter_class=_FORMATTER_CLASSES[node["formatter_class"]],
+        prefix_chars=node["prefix_chars"],
+        add_help=False,
+    )
+    groups = list(parser._action_groups)
+    for group, data in zip(groups, node["groups"]):
+        group.title = data["title"]
+
+    subparsers = node["subparsers"]
+    for i, data in enumerate(node["groups"]):
+        if i < len(groups):
+            continue
+        if subparsers is not None and subparsers["group"] == i:
+            # created together with the sub-commands
+            continue
+        groups.append(parser.add_argument_group(data["title"], data["description"]))
+
+    action_classes = parser._registries["action"]
+    for data in node["actions"]:
+        action_class = action_classes[data["kind"]]
+        parameters = inspect.signature(action_class.__init__).parameters
+        kwargs = {"action": data["kind"]}
+        for name in _ACTION_KWARGS:
+            if name in data and name in parameters and name != "dest":
+                kwargs[name] = data[name]
+        if data.get("metavar_tuple"):
+            kwargs["metavar"] = tuple(kwargs["metavar"])
+        if data["option_strings"]:
+            args = data["option_strings"]
+            kwargs["dest"] = data["dest"]
+        else:
+            args = [data["dest"]]
+        container = parser if data["group"] < 2 else groups[data["group"]]
+        container.add_argument(*args, **kwargs)
+
+    if subparsers is not None:
+        kwargs = {"metavar": subparsers["metavar"]}
+        if subparsers["help"] is not None:
+            kwargs["help"] = subparsers["help"]
+        if subparsers["group"] != 0:
+            group = node["groups"][subparsers["group"]]
+            kwargs["title"] = group["title"]
+            kwargs["description"] = group["description"]
+        action = parser.add_subparsers(**kwargs)
+        action.dest = subparsers["dest"]
+        action.required = subparsers["required"]
+        for name in subparsers["choices"]:
+            action.add_parser(name)
+    return parser
+
+
+def _get_sources(parser):
+    # the modules of all extensions which contributed to the help
+    parsers = [parser]
+    action = get_subparsers_action(parser)
+    if action is not None:
+        parsers.extend(action.choices.values())
+    sources = {}
+    for p in parsers:
+        for value in p._defaults.values():
+            module = sys.modules.get(type(value).__module__)
+            path = getattr(module, "__file__", None)
+            if path is None or path in sources:
+                continue
+            try:
+                sources[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+    return sorted(sources.items())
+
+
+def _are_sources_unchanged(node):
+    for path, mtime in node["sources"]:
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def _is_valid_manifest(manifest):
+    return (
+        isinstance(manifest, dict)
+        and manifest.get("version") == MANIFEST_VERSION
+        and manifest.get("fingerprint") == get_entry_point_index()["fingerprint"]
+    )
+
+
+def _to_str(value):
+    # descriptions might be string-like objects, e.g. a ``MutableString``
+    if value is None or isinstance(value, str):
+        return value
+    return str(getattr(value, "value", value))
+
+
+def _to_json(value):
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, (set, frozenset, range)):
+        return [_to_json(v) for v in value]
+    # only the string representation is used when rendering the help
+    return str(value)
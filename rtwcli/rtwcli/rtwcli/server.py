@@ -0,0 +1,420 @@
+# Copyright 2023, Stogl Robotics Consulting UG (haftungsbeschränkt)
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Warm server keeping a preloaded interpreter for repeated ``rtw`` invocations.
+
+The server loads the entry point index and imports / instantiates all
+extensions once.
+For every request it forks a worker which adopts the arguments, working
+directory, environment and terminal file descriptors of the client and runs
+:py:func:`rtwcli.cli.main` in-process.
+
+The client side only depends on the standard library so that forwarding an
+invocation is cheap.
+If the server isn't running, was started from a different Python
+environment or the installed plugins changed, the client falls back to
+in-process execution.
+"""
+
+import array
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+from rtwcli.cache import get_cache_path
+
+# Set ``RTW_NO_SERVER`` to any non-empty value to never use the server.
+DISABLE_ENVIRONMENT_VARIABLE = "RTW_NO_SERVER"
+
+# The server exits after being idle for this many seconds.
+DEFAULT_IDLE_TIMEOUT = 3600
+
+_HEADER = struct.Struct("!I")
+_FORWARDED_FDS = (0, 1, 2)
+
+_in_worker = False
+
+
+def get_socket_path():
+    """
+    Get the path of the server socket.
+
+    The socket is placed in ``$XDG_RUNTIME_DIR/rtwcli`` if available and in
+    the ``rtwcli`` cache directory otherwise.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "rtwcli", "server.sock")
+    return get_cache_path("server.sock")
+
+
+def forward_to_server(argv):
+    """
+    Run an invocation in the warm server if it is running.
+
+    :param list argv: the command line arguments
+    :returns: the return code of the command or ``None`` if the invocation
+      wasn't handled by the server
+    """
+    if _in_worker or os.environ.get(DISABLE_ENVIRONMENT_VARIABLE):
+        return None
+    # completion requests communicate through additional file descriptors
+    # and the server manages itself
+    if os.environ.get("_ARGCOMPLETE") or argv[:1] == ["server"]:
+        return None
+    path = get_socket_path()
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        request = {
+            "command": "run",
+            "argv": argv,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+            "executable": sys.executable,
+            "path": sys.path[1:],
+        }
+        send_message(sock, request, fds=_FORWARDED_FDS)
+        reply = receive_message(sock)
+    except OSError:
+        sock.close()
+        return None
+
+    with sock:
+        if reply is None or reply.get("status") != "accepted":
+            return None
+        while True:
+            try:
+                result = receive_message(sock)
+                break
+            except KeyboardInterrupt:
+                # the worker isn't part of the foreground process group
+                _kill_process_group(reply["pid"], signal.SIGINT)
+            except OSError:
+                result = None
+                break
+    if result is None:
+        return "The rtw server worker terminated unexpectedly"
+    return result.get("rc")
+
+
+def send_request(request, *, timeout=5.0):
+    """
+    Send a control request to the server and wait for the reply.
+
+    :param dict request: the request, e.g. ``{"command": "status"}``
+    :param float timeout: the timeout in seconds
+    :returns: the reply or ``None`` if the server isn't reachable
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(get_socket_path())
+            send_message(sock, request)
+            return receive_message(sock)
+        except OSError:
+            return None
+
+
+def send_message(sock, message, *, fds=None):
+    data = json.dumps(message).encode()
+    header = _HEADER.pack(len(data))
+    if fds:
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        sent = sock.sendmsg([header], ancillary)
+        header = header[sent:]
+    sock.sendall(header + data)
+
+
+def receive_message(sock, *, max_fds=0):
+    """
+    Receive a length prefixed JSON message.
+
+    :returns: the message or ``None`` if the connection was closed, if
+      ``max_fds`` is given a tuple of the message and the received file
+      descriptors
+    """
+    fds = array.array("i")
+    if max_fds:
+        data, ancdata, _, _ = sock.recvmsg(
+            _HEADER.size, socket.CMSG_LEN(max_fds * fds.itemsize)
+        )
+        for level, kind, cmsg_data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(cmsg_data[: len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+    else:
+        data = b""
+    data += _receive_exactly(sock, _HEADER.size - len(data))
+    message = None
+    if len(data) == _HEADER.size:
+        payload = _receive_exactly(sock, _HEADER.unpack(data)[0])
+        try:
+            message = json.loads(payload.decode())
+        except ValueError:
+            # the connection was closed in the middle of the message
+            message = None
+    if max_fds:
+        return message, list(fds)
+    return message
+
+
+def _receive_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _kill_process_group(pid, signum):
+    try:
+        os.killpg(pid, signum)
+    except OSError:
+        pass
+
+
+def serve(*, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """
+    Preload all extensions and serve requests until stopped.
+
+    :param float idle_timeout: the number of seconds without any request
+      after which the server exits, ``0`` to never exit
+    """
+    from rtwcli.entry_points import get_environment_fingerprint
+
+    fingerprint = get_environment_fingerprint()
+    preload_extensions()
+
+    path = get_socket_path()
+    listener = _bind(path)
+    statistics = {"pid": os.getpid(), "started": time.time(), "requests": 0}
+    last_activity = time.monotonic()
+    restart = False
+    try:
+        listener.settimeout(1.0)
+        while True:
+            _reap_workers()
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                if idle_timeout and time.monotonic() - last_activity > idle_timeout:
+                    break
+                continue
+            last_activity = time.monotonic()
+            with conn:
+                conn.settimeout(None)
+                action = _handle_connection(conn, fingerprint, statistics, listener)
+            if action == "stop":
+                break
+            if action == "restart":
+                restart = True
+                break
+    finally:
+        listener.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    if restart:
+        # reload the changed plugins in a fresh interpreter
+        os.execv(sys.executable, [sys.executable, "-m", "rtwcli.server", *sys.argv[1:]])
+
+
+def preload_extensions():
+    """Load the entry point index and instantiate all extensions."""
+    from rtwcli.entry_points import get_entry_point_index
+    from rtwcli.plugin_system import instantiate_extensions
+
+    for group_name in get_entry_point_index()["extension_points"]:
+        instantiate_extensions(group_name)
+
+
+def _bind(path):
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        if send_request({"command": "status"}, timeout=1.0) is not None:
+            raise RuntimeError(f"The rtw server is already running on '{path}'")
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(16)
+    return listener
+
+
+def _handle_connection(conn, fingerprint, statistics, listener):
+    from rtwcli.entry_points import get_environment_fingerprint
+
+    message, fds = receive_message(conn, max_fds=len(_FORWARDED_FDS))
+    try:
+        if message is None:
+            return None
+        if not _is_same_user(conn):
+            send_message(conn, {"status": "rejected", "reason": "different user"})
+            return None
+        command = message.get("command")
+        if command == "status":
+            send_message(conn, dict(statistics, status="running"))
+            return None
+        if command == "stop":
+            send_message(conn, {"status": "stopping"})
+            return "stop"
+        if command != "run" or len(fds) != len(_FORWARDED_FDS):
+            send_message(conn, {"status": "rejected", "reason": "invalid request"})
+            return None
+        if message.get("executable") != sys.executable or message.get("path") != sys.path[1:]:
+            send_message(conn, {"status": "rejected", "reason": "different Python environment"})
+            return None
+        if get_environment_fingerprint() != fingerprint:
+            send_message(conn, {"status": "rejected", "reason": "installed plugins changed"})
+            return "restart"
+
+        try:
+            pid = os.fork()
+        except OSError as e:
+            send_message(conn, {"status": "rejected", "reason": str(e)})
+            return None
+        if pid == 0:
+            # the worker never returns
+            listener.close()
+            _run_worker(conn, message, fds)
+        statistics["requests"] += 1
+        return None
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+
+def _is_same_user(conn):
+    try:
+        credentials = conn.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+    except (AttributeError, OSError):
+        # not supported on this platform, the socket permissions still apply
+        return True
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+def _run_worker(conn, message, fds):
+    global _in_worker
+    _in_worker = True
+    rc = 1
+    try:
+        for signum in (signal.SIGCHLD, signal.SIGTERM, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        # a separate process group allows the client to interrupt all
+        # processes spawned by the command
+        os.setsid()
+        send_message(conn, {"status": "accepted", "pid": os.getpid()})
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for target, fd in zip(_FORWARDED_FDS, fds):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd not in _FORWARDED_FDS:
+                os.close(fd)
+        os.chdir(message["cwd"])
+        os.environ.clear()
+        os.environ.update(message["env"])
+        sys.argv = [sys.argv[0], *message["argv"]]
+
+        from rtwcli.cli import main
+
+        try:
+            rc = main(argv=message["argv"])
+        except SystemExit as e:
+            rc = e.code
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            send_message(conn, {"rc": rc if rc is None or isinstance(rc, (int, str)) else 1})
+        finally:
+            os._exit(0)
+
+
+def _reap_workers():
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+def start_server_in_background(*, idle_timeout=DEFAULT_IDLE_TIMEOUT, timeout=30.0):
+    """
+    Start the server as a detached process and wait until it accepts requests.
+
+    :returns: the status of the started server or ``None`` if it didn't
+      come up in time
+    """
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, "-m", "rtwcli.server", "--idle-timeout", str(idle_timeout)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        close_fds=True,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = send_request({"command": "status"}, timeout=1.0)
+        if status is not None:
+            return status
+        time.sleep(0.05)
+    return None
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the rtw warm server in the foreground.")
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="Exit after being idle for this many seconds (0 to never exit)",
+    )
+    args = parser.parse_args(argv)
+    serve(idle_timeout=args.idle_timeout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,6 +41,7 @@ commands and verbs.""",
             "extension_points =" " rtwcli.command.extension_points:ExtensionPointsCommand",
             "extensions = rtwcli.command.extensions:ExtensionsCommand",
             "info = rtwcli.command.info:InfoCommand",
+            "server = rtwcli.command.server:ServerCommand",
         ],
         "rtwcli.extension_point": [
             "rtwcli.command = rtwcli.command:CommandExtension",